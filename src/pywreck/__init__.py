@@ -13,11 +13,18 @@
 # limitations under the License.
 
 import asyncio
+import functools
+import ipaddress
 import os.path
+import socket
 import ssl
+import time
+from collections import deque
 from dataclasses import dataclass
+from itertools import starmap
+from ssl import SSLError
 from types import TracebackType
-from typing import Dict, Mapping, Optional, Type, Union
+from typing import Deque, Dict, List, Mapping, Optional, Tuple, Type, Union
 
 try:
     with open(os.path.join(os.path.dirname(__file__), "version.txt")) as f:
@@ -25,20 +32,93 @@ try:
 except Exception:  # pragma: no cover
     __version__ = "0.0.0"  # pragma: no cover
 
+_USER_AGENT = f"pywreck/{__version__}"
+_HEADER_CACHE_SIZE = 64
+_DEFAULT_HEADER_NAMES = frozenset(("host", "user-agent", "content-length"))
+_METHOD_PREFIXES = {
+    method: f"{method} ".encode("latin1")
+    for method in ("GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS", "PATCH")
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _normalize_header_name(name: str) -> str:
+    # Servers send the same few header names with every response; memoizing
+    # them skips the strip / lower copies and hands back the same (already
+    # hashed) str object for each occurrence
+    return name.rstrip().lower()
+
+
+_SET_COOKIE = _normalize_header_name("set-cookie")
+
+_DNS_TTL = 60.0
+_DNS_CACHE: Dict[Tuple[str, int], Tuple[float, List[Tuple[int, str]]]] = {}
+
+
+async def _resolve(host: str, port: int) -> List[Tuple[int, str]]:
+    # Resolved addresses are cached so that new connections to a host do not
+    # pay for a getaddrinfo call (run in the default executor) every time
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:
+        # IP literals need no lookup
+        return [(socket.AF_UNSPEC, host)]
+
+    key = (host, port)
+    cached = _DNS_CACHE.get(key)
+    now = time.monotonic()
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    addr_info = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    addresses: List[Tuple[int, str]] = []
+    for family, _, _, _, sockaddr in addr_info:
+        address = str(sockaddr[0])
+        if family == socket.AF_INET6 and len(sockaddr) == 4 and sockaddr[3]:
+            # Link local addresses are only reachable through their scope
+            address = f"{address}%{sockaddr[3]}"
+        addresses.append((family, address))
+
+    # Drop expired entries so hosts that are no longer used do not accumulate
+    expired = [k for k, (expires, _) in _DNS_CACHE.items() if expires <= now]
+    for k in expired:
+        del _DNS_CACHE[k]
+
+    _DNS_CACHE[key] = (now + _DNS_TTL, addresses)
+    return addresses
+
 
 @dataclass(frozen=True)
 class Response:
     """HTTP Response Container"""
 
+    __slots__ = ("status", "headers", "data")
+
     status: int
     headers: Dict[str, str]
     data: bytes
 
+    # The default slots state is restored with setattr, which frozen
+    # dataclasses reject; restore it the same way dataclass(slots=True) does
+    def __getstate__(self) -> Tuple[int, Dict[str, str], bytes]:
+        return (self.status, self.headers, self.data)
+
+    def __setstate__(self, state: Tuple[int, Dict[str, str], bytes]) -> None:
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
 
 class Connection:
     """Streaming connection wrapper
 
     Provides an interface to make HTTP requests via a streaming connection.
+    Concurrent requests on a single connection are pipelined: each request is
+    sent immediately and responses are returned in the order requests were
+    made.
 
     It is not recommended to instantiate :class:`Connection` objects directly;
     use :meth:`Connection.create()` instead.
@@ -48,22 +128,34 @@ class Connection:
         self,
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
-        lock: asyncio.Lock,
         host: str,
         close_timeout: Optional[float],
     ):
         self._reader = reader
         self._writer = writer
-        self._lock = lock
+        self._transport = writer.transport
         self._host = host
         self._close_timeout = close_timeout
-
-    async def _readline_ascii(self) -> str:
-        result = await self._reader.readline()
-        return result.decode("latin1")
-
-    def _write_ascii(self, data: str) -> None:
-        return self._writer.write(data.encode("latin1"))
+        default_headers = f"host:{host}\r\nuser-agent:{_USER_AGENT}\r\n"
+        self._default_headers = default_headers.encode("latin1")
+        self._pending: Deque[Tuple[str, "asyncio.Future[Response]"]] = deque()
+        self._reader_task: "Optional[asyncio.Task[None]]" = None
+        self._reusable = True
+        self._header_cache: Dict[Tuple[str, str], bytes] = {}
+
+    def _encode_header(self, name: str, value: str) -> bytes:
+        # Most request headers (accept, authorization, ...) are repeated
+        # verbatim on a connection, so their encoded form is memoized. Once the
+        # cache is full new values are no longer added, so per-request values
+        # (request ids, dates, ...) cannot evict the stable ones.
+        key = (name, value)
+        header_cache = self._header_cache
+        encoded = header_cache.get(key)
+        if encoded is None:
+            encoded = f"{name}:{value}\r\n".encode("latin1")
+            if len(header_cache) < _HEADER_CACHE_SIZE:
+                header_cache[key] = encoded
+        return encoded
 
     @classmethod
     async def create(
@@ -72,6 +164,7 @@ class Connection:
         port: int = 443,
         ssl: Union[bool, ssl.SSLContext] = True,
         close_timeout: Optional[float] = 5.0,
+        read_limit: int = 2**16,
     ) -> "Connection":
         """Create a Connection
 
@@ -89,11 +182,38 @@ class Connection:
             for the connection to close before forcing the connection to close
             via TCP RST. Default: 5 seconds
         :type close_timeout: float
+        :param read_limit: (optional) The size in bytes of the read buffer
+            kept for the connection. This also limits the size of a response
+            head. Raising it reduces how often reading pauses while large
+            responses are received. Default: 64 KiB
+        :type read_limit: int
 
         :rtype: Connection
         """
-        reader, writer = await asyncio.open_connection(host, port, ssl=ssl)
-        return Connection(reader, writer, asyncio.Lock(), host, close_timeout)
+        server_hostname = host if ssl else None
+        error: Optional[OSError] = None
+        for family, address in await _resolve(host, port):
+            try:
+                reader, writer = await asyncio.open_connection(
+                    address,
+                    port,
+                    ssl=ssl,
+                    family=family,
+                    server_hostname=server_hostname,
+                    limit=read_limit,
+                )
+            except SSLError:
+                # The address was reached; TLS failures are not retried
+                raise
+            except OSError as e:
+                error = e
+            else:
+                return Connection(reader, writer, host, close_timeout)
+
+        # None of the addresses could be reached; resolve again next time
+        _DNS_CACHE.pop((host, port), None)
+        assert error is not None
+        raise error
 
     async def __aenter__(self) -> "Connection":
         return self
@@ -135,89 +255,165 @@ class Connection:
 
         :rtype: Response
         """
-        coro = self._request(method, uri, payload, headers)
+        # The request is sent synchronously, so only the response needs to be
+        # waited on. Waiting on the future directly (rather than a coroutine)
+        # means no extra task is created to enforce the timeout.
+        future = self._send(method, uri, payload, headers)
         if timeout is not None:
-            return await asyncio.wait_for(coro, timeout=timeout)
-        return await coro
+            return await asyncio.wait_for(future, timeout=timeout)
+        return await future
 
-    async def _request(
+    def _send(
         self,
         method: str,
         uri: str,
         payload: bytes = b"",
         headers: Optional[Mapping[str, str]] = None,
-    ) -> Response:
-        # Since the connection can be a shared resource, we must ensure
-        # exclusive access for the duration of the request/response cycle
-        async with self._lock:
-            reader, writer = self._reader, self._writer
-            request = f"{method} {uri} HTTP/1.1\r\n"
-            self._write_ascii(request)
-
+    ) -> "asyncio.Future[Response]":
+        method_prefix = _METHOD_PREFIXES.get(method)
+        if method_prefix is None:
+            method_prefix = f"{method} ".encode("latin1")
+        parts = [method_prefix, uri.encode("latin1"), b" HTTP/1.1\r\n"]
+
+        if headers and not _DEFAULT_HEADER_NAMES.isdisjoint(headers):
+            # Caller supplied headers override the defaults in place
             request_headers = {
                 "host": self._host,
-                "user-agent": f"pywreck/{__version__}",
+                "user-agent": _USER_AGENT,
             }
             if payload:
                 request_headers["content-length"] = str(len(payload))
-
-            if headers:
-                request_headers.update(headers)
-
-            for header_name, header_value in request_headers.items():
-                self._write_ascii(f"{header_name}:{header_value}\r\n")
-
-            # Finish request metadata section
-            writer.write(b"\r\n")
-
-            # Send payload
-            writer.write(payload)
-
-            response_line = await self._readline_ascii()
-            status = int(response_line.split(" ", 2)[1])
-
-            response_headers: Dict[str, str] = {}
-            content_length = 0
-            chunked = False
-
+            request_headers.update(headers)
+            headers = request_headers
+        else:
+            parts.append(self._default_headers)
+            if payload:
+                parts.append(b"content-length:%d\r\n" % len(payload))
+
+        if headers:
+            parts.extend(starmap(self._encode_header, headers.items()))
+
+        # Finish request metadata section
+        parts.append(b"\r\n")
+
+        # An empty part must not be written: on Python 3.12+ writelines keeps
+        # a zero length buffer queued that the transport never flushes
+        if payload:
+            parts.append(payload)
+
+        # Send the request head and payload with a single call so the
+        # transport can emit it as one segment (and one TLS record).
+        # Transports that support scatter / gather I/O (sendmsg) write the
+        # parts without joining them into an intermediate buffer first.
+        transport = self._transport
+        if transport.is_closing():
+            # writelines on Python 3.12 / 3.13 selector transports does not
+            # check for a lost connection, while write does; the connection
+            # error is then raised when the response is read
+            transport.write(b"".join(parts))
+        else:
+            transport.writelines(parts)
+
+        # Writing does not yield to the event loop, so requests are queued in
+        # the same order they are sent. Responses are read back in that order
+        # by a single reader task, allowing requests to be pipelined.
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Response]" = loop.create_future()
+        self._pending.append((method, future))
+
+        # The reader task only runs while there are responses outstanding
+        reader_task = self._reader_task
+        if reader_task is None or reader_task.done():
+            self._reader_task = loop.create_task(self._read_responses())
+
+        return future
+
+    async def _read_responses(self) -> None:
+        pending = self._pending
+        try:
+            while pending:
+                method, future = pending[0]
+                response = await self._read_response(method)
+                pending.popleft()
+                if not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            for _, future in pending:
+                future.cancel()
+            pending.clear()
+            raise
+        except Exception as exc:
+            # The response stream can no longer be trusted, so every request
+            # waiting on it is failed
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            pending.clear()
+
+    async def _read_response(self, method: str) -> Response:
+        reader = self._reader
+
+        # Read the status line and all headers in one pass
+        head = await reader.readuntil(b"\r\n\r\n")
+
+        # The status code is always the 3 digits following the HTTP version
+        status_start = head.index(b" ") + 1
+        status = int(head[status_start : status_start + 3])
+
+        _, *header_lines = head[:-4].decode("latin1").split("\r\n")
+
+        response_headers: Dict[str, str] = {}
+        content_length = 0
+        chunked = False
+
+        for header_line in header_lines:
+            header_name, header_value = header_line.split(":", 1)
+            header_name = _normalize_header_name(header_name)
+            header_value = header_value.strip()
+
+            if header_name in response_headers:
+                separator = "," if header_name != _SET_COOKIE else ";"
+                response_headers[header_name] += separator + header_value
+            else:
+                response_headers[header_name] = header_value
+
+        # HTTP/1.1 connections are persistent unless either side opts out,
+        # while HTTP/1.0 servers must opt in
+        connection_options = response_headers.get("connection", "").lower()
+        if head.startswith(b"HTTP/1.0"):
+            keep_alive = "keep-alive" in connection_options
+        else:
+            keep_alive = "close" not in connection_options
+        if not keep_alive:
+            self._reusable = False
+
+        if method != "HEAD":
+            if "content-length" in response_headers:
+                content_length = int(response_headers["content-length"])
+
+            chunked = response_headers.get("transfer-encoding", "") == "chunked"
+
+        if chunked:
+            response_chunks: List[memoryview] = []
             while True:
-                header_line = await self._readline_ascii()
-                header_line = header_line.rstrip()
-                if not header_line:
+                chunk_len_bytes = await reader.readuntil(b"\r\n")
+                content_length = int(chunk_len_bytes, 16)
+                part = await reader.readexactly(content_length + 2)
+                if not content_length:
                     break
+                # Strip the trailing CRLF without copying the chunk
+                response_chunks.append(memoryview(part)[:-2])
 
-                header_name, header_value = header_line.split(":", 1)
-                header_name = header_name.rstrip().lower()
-                header_value = header_value.lstrip()
-
-                if header_name in response_headers:
-                    separator = "," if header_name != "set-cookie" else ";"
-                    response_headers[header_name] += separator + header_value
-                else:
-                    response_headers[header_name] = header_value
-
-            if method != "HEAD":
-                if "content-length" in response_headers:
-                    content_length = int(response_headers["content-length"])
-
-                chunked = response_headers.get("transfer-encoding", "") == "chunked"
-
-            if chunked:
-                response_chunks = []
-                while True:
-                    chunk_len_bytes = await reader.readuntil(b"\r\n")
-                    content_length = int(chunk_len_bytes.rstrip(), 16)
-                    part = await reader.readexactly(content_length + 2)
-                    if not content_length:
-                        break
-                    response_chunks.append(part[:-2])
-
-                response_data = b"".join(response_chunks)
-            else:
-                response_data = await reader.readexactly(content_length)
+            response_data = b"".join(response_chunks)
+        else:
+            response_data = await reader.readexactly(content_length)
 
         return Response(status, response_headers, response_data)
 
+    def _is_lost(self) -> bool:
+        # The server closed or reset the connection
+        return self._reader.at_eof() or self._transport.is_closing()
+
     async def __aexit__(
         self,
         exc: Optional[Type[BaseException]],
@@ -241,6 +437,224 @@ class Connection:
             await writer.wait_closed()
         finally:
             writer.transport.abort()
+            reader_task = self._reader_task
+            if reader_task is not None and not reader_task.done():
+                reader_task.cancel()
+                await asyncio.wait((reader_task,))
+
+
+class Pool:
+    """Connection pool
+
+    Maintains a set of :class:`Connection` objects to a single host so that
+    connections (and their TCP / TLS handshakes) are reused across requests.
+    An idle connection is handed out without yielding to the event loop.
+
+    :param host: Host string controlling both the DNS request and the
+        host header.
+    :type host: str
+    :param port: (optional) The TCP port used for connections.
+        Default: 443
+    :type port: int
+    :param ssl: (optional) Indicates if SSL is to be used in
+        establishing connections. Also accepts an SSLContext object.
+        Default: True
+    :type ssl: bool or ssl.SSLContext
+    :param max_size: (optional) The number of connections kept open by the
+        pool. Default: 10
+    :type max_size: int
+    :param burst_limit: (optional) The number of connections that may be open
+        at once when all ``max_size`` connections are in use. Connections
+        beyond ``max_size`` are closed once they are no longer in use.
+        Default: ``max_size``
+    :type burst_limit: int
+    :param close_timeout: (optional) The amount of time to wait in seconds
+        for a connection to close before forcing the connection to close
+        via TCP RST. Default: 5 seconds
+    :type close_timeout: float
+    :param read_limit: (optional) The size in bytes of the read buffer kept
+        for each connection. See :meth:`Connection.create`. Default: 64 KiB
+    :type read_limit: int
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 443,
+        ssl: Union[bool, ssl.SSLContext] = True,
+        max_size: int = 10,
+        burst_limit: Optional[int] = None,
+        close_timeout: Optional[float] = 5.0,
+        read_limit: int = 2**16,
+    ):
+        self._host = host
+        self._port = port
+        self._ssl = ssl
+        self._max_size = max_size
+        self._limit = max_size if burst_limit is None else burst_limit
+        self._close_timeout = close_timeout
+        self._read_limit = read_limit
+        self._idle: Deque[Connection] = deque()
+        self._size = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._closed = False
+
+    async def __aenter__(self) -> "Pool":
+        return self
+
+    async def request(
+        self,
+        method: str,
+        uri: str,
+        payload: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = 5.0,
+    ) -> Response:
+        """Make an HTTP request
+
+        Drives a full request/response cycle using the HTTP/1.1 protocol on a
+        pooled connection. See :meth:`Connection.request` for details.
+
+        :param method: HTTP method string send in the request line.
+        :type method: str
+        :param uri: Request-Uniform Resource Identifier (URI), usually
+            the absolute path to the resource being requested.
+        :type uri: str
+        :param payload: (optional) The encoded HTTP request body bytes to be
+            sent. Default: b""
+        :type payload: bytes
+        :param headers: (optional) A dictionary of headers to be sent
+            with the request. Default: {}
+        :type headers: dict
+        :param timeout: (optional) Timeout in seconds for the request,
+            including the time spent waiting for a connection.
+            Default: 5 seconds.
+        :type timeout: float
+
+        :rtype: Response
+        """
+        coro = self._request(method, uri, payload, headers)
+        if timeout is not None:
+            return await asyncio.wait_for(coro, timeout=timeout)
+        return await coro
+
+    async def _request(
+        self,
+        method: str,
+        uri: str,
+        payload: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Response:
+        connection = await self._acquire()
+        try:
+            response = await connection.request(method, uri, payload, headers, None)
+        except BaseException:
+            # The state of the connection is unknown, so it is not reused
+            await self._discard(connection)
+            raise
+
+        if (
+            self._closed
+            or not connection._reusable
+            or (self._size > self._max_size and not self._waiters)
+        ):
+            await self._discard(connection)
+        else:
+            self._idle.append(connection)
+            self._wakeup()
+
+        return response
+
+    async def _acquire(self) -> Connection:
+        idle = self._idle
+        while True:
+            if self._closed:
+                raise RuntimeError("Pool is closed")
+
+            if idle:
+                connection = idle.pop()
+                if not connection._is_lost():
+                    return connection
+
+                # The server closed (or reset) the connection while it was
+                # idle. No graceful shutdown is needed, and closing a reset
+                # connection would raise the stored error.
+                self._size -= 1
+                connection._transport.abort()
+                continue
+
+            if self._size < self._limit:
+                self._size += 1
+                try:
+                    return await Connection.create(
+                        self._host,
+                        self._port,
+                        ssl=self._ssl,
+                        close_timeout=self._close_timeout,
+                        read_limit=self._read_limit,
+                    )
+                except BaseException:
+                    self._size -= 1
+                    self._wakeup()
+                    raise
+
+            waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wakeup that arrived as this waiter was cancelled
+                if waiter.done() and not waiter.cancelled():
+                    self._wakeup()
+                raise
+
+    def _wakeup(self) -> None:
+        waiters = self._waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _discard(self, connection: Connection) -> None:
+        self._size -= 1
+        self._wakeup()
+        await connection.close()
+
+    async def __aexit__(
+        self,
+        exc: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the pool
+
+        Idle connections are closed immediately; connections in use are closed
+        once their request completes. No new requests are accepted.
+        """
+        self._closed = True
+
+        # Waiting requests are woken up so that they fail
+        waiters = self._waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+        idle = self._idle
+        connections = []
+        while idle:
+            connection = idle.pop()
+            self._size -= 1
+            if connection._is_lost():
+                # Lost connections need no graceful shutdown
+                connection._transport.abort()
+            else:
+                connections.append(connection)
+        await asyncio.gather(*(connection.close() for connection in connections))
 
 
 async def request(
@@ -13,33 +13,58 @@
 # limitations under the License.
 
 import asyncio
+import re
+import socket
+import struct
 
 SHUTDOWN_EVENTS = []
 
+# Matched case insensitively without making a lowercased copy of the head
+CONTENT_LENGTH = re.compile(rb"\r\ncontent-length:[ \t]*(\d+)", re.IGNORECASE)
+
+STATUS_OK = b"HTTP/1.1 200 OK\r\n"
+ECHO_HEAD = STATUS_OK + b"content-length: %d\r\n\r\n"
+
+# Fixed responses are built once at import time
+MULTI_HEADER_RESPONSE = STATUS_OK + b"foo:1:1\r\nfoo:2:2\r\n\r\n"
+COOKIES_RESPONSE = STATUS_OK + b"set-cookie: foo=bar\r\nset-cookie: boo=baz\r\n\r\n"
+NO_HEADERS_RESPONSE = b"HTTP/1.1 204 No Content\r\n\r\n"
+CONNECTION_CLOSE_RESPONSE = (
+    STATUS_OK + b"connection: close\r\ncontent-length: 0\r\n\r\n"
+)
+
+# The chunked body is framed once as well
+CHUNKS = (b"*" * 16, b"foo", b"")
+CHUNKED_BODY = b"".join(b"%x\r\n%s\r\n" % (len(chunk), chunk) for chunk in CHUNKS)
+CHUNKED_RESPONSE = STATUS_OK + b"transfer-encoding: chunked\r\n\r\n" + CHUNKED_BODY
+
 
 async def read_request(reader):
-    request = []
-    content_length = 0
+    # A single timeout covers reading the whole request
+    return await asyncio.wait_for(_read_request(reader), timeout=0.1)
 
-    while True:
-        line = await asyncio.wait_for(
-            reader.readline(),
-            timeout=0.1,
-        )
-        request.append(line)
-        if not line.rstrip():
-            break
 
-        if line.lower().startswith(b"content-length"):
-            content_length = int(line[15:])
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        # The client closed the connection
+        return e.partial
 
-    data = await asyncio.wait_for(
-        reader.readexactly(content_length),
-        timeout=0.1,
-    )
-    request.append(data)
+    match = CONTENT_LENGTH.search(head)
+    if not match:
+        return head
 
-    return b"".join(request)
+    data = await reader.readexactly(int(match[1]))
+
+    return head + data
+
+
+async def drain(writer):
+    # Small responses are written straight to the socket, leaving nothing
+    # to wait for
+    if writer.transport.get_write_buffer_size():
+        await writer.drain()
 
 
 async def handle_echo(reader, writer):
@@ -47,10 +72,8 @@ async def handle_echo(reader, writer):
         output = await read_request(reader)
         if not output:
             break
-        writer.write(b"HTTP/1.1 200 OK\r\n")
-        writer.write(f"content-length: {len(output)}\r\n\r\n".encode("latin1"))
-        writer.write(output)
-        await writer.drain()
+        writer.writelines([ECHO_HEAD % len(output), output])
+        await drain(writer)
 
     writer.close()
     await writer.wait_closed()
@@ -58,11 +81,8 @@ async def handle_echo(reader, writer):
 
 async def handle_multi_response_headers(reader, writer):
     await read_request(reader)
-    writer.write(b"HTTP/1.1 200 OK\r\n")
-    writer.write(b"foo:1:1\r\n")
-    writer.write(b"foo:2:2\r\n")
-    writer.write(b"\r\n")
-    await writer.drain()
+    writer.write(MULTI_HEADER_RESPONSE)
+    await drain(writer)
     writer.close()
     await writer.wait_closed()
 
@@ -73,29 +93,33 @@ async def handle_chunked(reader, writer):
         if not output:
             break
 
-        writer.write(b"HTTP/1.1 200 OK\r\n")
-        writer.write(b"transfer-encoding: chunked\r\n")
-        writer.write(b"\r\n")
-        await writer.drain()
+        writer.write(CHUNKED_RESPONSE)
+        await drain(writer)
+
+    writer.close()
+    await writer.wait_closed()
 
-        chunks = [b"*" * 16, b"foo", b""]
-        for chunk in chunks:
-            hex_len = b"%x\r\n" % len(chunk)
-            writer.write(hex_len)
-            writer.write(chunk + b"\r\n")
-            await writer.drain()
 
+async def handle_no_headers(reader, writer):
+    await read_request(reader)
+    writer.write(NO_HEADERS_RESPONSE)
+    await drain(writer)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def handle_connection_close(reader, writer):
+    await read_request(reader)
+    writer.write(CONNECTION_CLOSE_RESPONSE)
+    await drain(writer)
     writer.close()
     await writer.wait_closed()
 
 
 async def handle_cookies(reader, writer):
     await read_request(reader)
-    writer.write(b"HTTP/1.1 200 OK\r\n")
-    writer.write(b"set-cookie: foo=bar\r\n")
-    writer.write(b"set-cookie: boo=baz\r\n")
-    writer.write(b"\r\n")
-    await writer.drain()
+    writer.write(COOKIES_RESPONSE)
+    await drain(writer)
     writer.close()
     await writer.wait_closed()
 
@@ -104,6 +128,17 @@ async def handle_rst(_reader, writer):
     writer.transport.abort()
 
 
+async def handle_rst_after_response(reader, writer):
+    await read_request(reader)
+    writer.write(NO_HEADERS_RESPONSE)
+    await drain(writer)
+
+    # Closing with a zero linger timeout sends a RST rather than a FIN
+    sock = writer.get_extra_info("socket")
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    writer.transport.abort()
+
+
 async def handle_fin(_reader, writer):
     # EOF triggers TCP FIN
     writer.transport.write_eof()
@@ -116,3 +151,11 @@ async def handle_fin(_reader, writer):
     # Close the socket
     writer.close()
     await writer.wait_closed()
+
+
+async def handle_plaintext(_reader, writer):
+    # Answer a TLS handshake with a plaintext response
+    writer.write(NO_HEADERS_RESPONSE)
+    await drain(writer)
+    writer.close()
+    await writer.wait_closed()
@@ -13,8 +13,12 @@
 # limitations under the License.
 
 import asyncio
+import copy
 import functools
+import math
+import pickle
 import socket
+import ssl
 
 import pytest
 
@@ -23,19 +27,35 @@ import pywreck
 from .handlers import (
     SHUTDOWN_EVENTS,
     handle_chunked,
+    handle_connection_close,
     handle_cookies,
     handle_echo,
     handle_fin,
     handle_multi_response_headers,
+    handle_no_headers,
+    handle_plaintext,
     handle_rst,
+    handle_rst_after_response,
 )
 
 
 @pytest.fixture(scope="session")
 def loop():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    return loop
+    try:
+        import uvloop
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    else:
+        loop = uvloop.new_event_loop()
+
+    # Debug mode (e.g. from PYTHONASYNCIODEBUG or -X dev) adds per-callback
+    # bookkeeping that only slows the suite down
+    loop.set_debug(False)
+
+    # The loop is passed explicitly to every test rather than installed as
+    # the current event loop, so no global policy state is touched
+    yield loop
+    loop.close()
 
 
 @pytest.fixture
@@ -43,42 +63,48 @@ def handler(request):
     return request.param
 
 
-@pytest.fixture
-def port(loop, handler):
-    # Get a random port
-    s = socket.socket()
-    s.bind(("", 0))
-    _port = s.getsockname()[1]
-    s.close()
-
-    server = loop.run_until_complete(asyncio.start_server(handler, "127.0.0.1", _port))
-    yield _port
+def _serve(loop, handler):
+    tasks = []
+
+    async def _handler(reader, writer):
+        tasks.append(asyncio.current_task())
+        await handler(reader, writer)
+
+    # Let the OS pick a free port for the server
+    server = loop.run_until_complete(asyncio.start_server(_handler, "127.0.0.1", 0))
+    yield server.sockets[0].getsockname()[1]
     while SHUTDOWN_EVENTS:
         SHUTDOWN_EVENTS.pop().set()
     server.close()
-    loop.create_task(server.wait_closed())
+    loop.run_until_complete(asyncio.wait_for(server.wait_closed(), timeout=0.1))
 
-    tasks_to_shutdown = asyncio.all_tasks(loop=loop)
-    loop.run_until_complete(
-        asyncio.wait_for(
-            asyncio.gather(*tasks_to_shutdown),
-            timeout=0.1,
-        )
-    )
+    # wait_closed only waits for handlers on Python 3.12+; gathering them
+    # also surfaces any exception a handler raised
+    loop.run_until_complete(asyncio.wait_for(asyncio.gather(*tasks), timeout=0.1))
+
+
+@pytest.fixture
+def port(loop, handler):
+    yield from _serve(loop, handler)
+
+
+@pytest.fixture(scope="module")
+def echo_port(loop):
+    # A single echo server is shared by every test that uses it
+    yield from _serve(loop, handle_echo)
 
 
 @pytest.mark.parametrize(
     "method",
     ("get", "head", "post", "put", "delete"),
 )
-@pytest.mark.parametrize("handler", (handle_echo,), indirect=True)
-def test_basic(loop, port, method):
+def test_basic(loop, echo_port, method):
     response = loop.run_until_complete(
         getattr(pywreck, method)(
             "localhost",
             "/",
             headers={"user-agent": "pywreck test, yo!"},
-            port=port,
+            port=echo_port,
             ssl=False,
             timeout=0.2,
         )
@@ -100,8 +126,18 @@ def test_basic(loop, port, method):
         assert data == expected_data
 
 
-@pytest.mark.parametrize("handler", (handle_echo,), indirect=True)
-def test_multiple_requests_on_a_single_connection(loop, port):
+def test_response_copy_and_pickle():
+    response = pywreck.Response(200, {"foo": "bar"}, b"data")
+    for copied in (
+        copy.copy(response),
+        copy.deepcopy(response),
+        pickle.loads(pickle.dumps(response)),
+    ):
+        assert copied == response
+        assert copied is not response
+
+
+def test_multiple_requests_on_a_single_connection(loop, echo_port):
     def validate_response(response):
         assert response.status == 200
         data = response.data
@@ -118,7 +154,7 @@ def test_multiple_requests_on_a_single_connection(loop, port):
     async def _async():
         connection = await pywreck.Connection.create(
             "localhost",
-            port=port,
+            port=echo_port,
             ssl=False,
         )
 
@@ -134,15 +170,291 @@ def test_multiple_requests_on_a_single_connection(loop, port):
     loop.run_until_complete(_async())
 
 
-@pytest.mark.parametrize("handler", (handle_echo,), indirect=True)
-def test_payload(loop, port):
+def test_requests_without_payload_on_a_single_connection(loop, echo_port):
+    async def _async():
+        connection = await pywreck.Connection.create(
+            "localhost", port=echo_port, ssl=False
+        )
+
+        async with connection:
+            for _ in range(2):
+                response = await connection.request("GET", "/", timeout=0.2)
+                assert response.status == 200
+
+            # Nothing is left queued on the transport, so it closes promptly
+            connection._writer.close()
+            await asyncio.wait_for(connection._writer.wait_closed(), timeout=0.1)
+
+    loop.run_until_complete(_async())
+
+
+def test_pipelined_requests_on_a_single_connection(loop, echo_port):
+    async def _async():
+        connection = await pywreck.Connection.create(
+            "localhost",
+            port=echo_port,
+            ssl=False,
+        )
+
+        async with connection:
+            uris = [f"/{i}" for i in range(3)]
+            responses = await asyncio.gather(
+                *(connection.request("GET", uri) for uri in uris)
+            )
+
+        for uri, response in zip(uris, responses):
+            assert response.status == 200
+            assert response.data.startswith(f"GET {uri} HTTP/1.1\r\n".encode())
+
+    loop.run_until_complete(_async())
+
+
+def test_timed_out_request_on_a_single_connection(loop, echo_port):
+    async def _async():
+        connection = await pywreck.Connection.create(
+            "localhost",
+            port=echo_port,
+            ssl=False,
+        )
+
+        async with connection:
+            with pytest.raises(asyncio.TimeoutError):
+                await connection.request("GET", "/timeout", timeout=0)
+
+            # The response to the timed out request is discarded
+            response = await connection.request("GET", "/")
+            assert response.data.startswith(b"GET / HTTP/1.1\r\n")
+
+    loop.run_until_complete(_async())
+
+
+def test_header_cache_is_per_connection_and_bounded(loop, echo_port):
+    async def _async():
+        connection = await pywreck.Connection.create(
+            "localhost",
+            port=echo_port,
+            ssl=False,
+        )
+
+        async with connection:
+            for i in range(pywreck._HEADER_CACHE_SIZE + 1):
+                response = await connection.request(
+                    "GET", "/", headers={"x-request-id": str(i)}
+                )
+                assert f"x-request-id:{i}\r\n".encode() in response.data
+
+            assert len(connection._header_cache) == pywreck._HEADER_CACHE_SIZE
+            assert ("x-request-id", "0") in connection._header_cache
+
+    loop.run_until_complete(_async())
+
+
+def test_pool_reuses_connections(loop, echo_port):
+    async def _async():
+        async with pywreck.Pool(
+            "localhost", port=echo_port, ssl=False, max_size=1
+        ) as pool:
+            responses = await asyncio.gather(
+                *(pool.request("GET", f"/{i}") for i in range(3))
+            )
+            assert pool._size == 1
+            assert len(pool._idle) == 1
+
+        assert pool._size == 0
+        for i, response in enumerate(responses):
+            assert response.status == 200
+            assert response.data.startswith(f"GET /{i} HTTP/1.1\r\n".encode())
+
+    loop.run_until_complete(_async())
+
+
+def test_pool_burst_limit(loop, echo_port):
+    async def _async():
+        pool = pywreck.Pool(
+            "localhost",
+            port=echo_port,
+            ssl=False,
+            max_size=1,
+            burst_limit=2,
+        )
+        async with pool:
+            responses = await asyncio.gather(
+                *(pool.request("GET", "/") for _ in range(2))
+            )
+            # The burst connection is closed once it is no longer in use
+            assert pool._size == 1
+            assert len(pool._idle) == 1
+
+        assert [response.status for response in responses] == [200, 200]
+
+    loop.run_until_complete(_async())
+
+
+def test_pool_close_with_request_in_flight(loop, echo_port):
+    async def _async():
+        pool = pywreck.Pool("localhost", port=echo_port, ssl=False, max_size=1)
+        in_flight = asyncio.ensure_future(pool.request("GET", "/"))
+        waiting = asyncio.ensure_future(pool.request("GET", "/"))
+        while not pool._waiters:
+            await asyncio.sleep(0)
+
+        await pool.close()
+        assert (await in_flight).status == 200
+        with pytest.raises(RuntimeError):
+            await waiting
+
+        # The in flight connection is closed rather than returned to the pool
+        assert pool._size == 0
+        assert not pool._idle
+
+        with pytest.raises(RuntimeError):
+            await pool.request("GET", "/")
+
+    loop.run_until_complete(_async())
+
+
+@pytest.mark.parametrize("handler", (handle_connection_close,), indirect=True)
+def test_pool_connection_close(loop, port):
+    async def _async():
+        async with pywreck.Pool("localhost", port=port, ssl=False, max_size=1) as pool:
+            for _ in range(2):
+                response = await pool.request("GET", "/")
+                assert response.status == 200
+                assert response.headers["connection"] == "close"
+
+                # The server closed the connection so it is not reused
+                assert pool._size == 0
+                assert not pool._idle
+
+    loop.run_until_complete(_async())
+
+
+@pytest.mark.parametrize("handler", (handle_no_headers,), indirect=True)
+def test_pool_discards_closed_idle_connections(loop, port):
+    async def _async():
+        async with pywreck.Pool("localhost", port=port, ssl=False, max_size=1) as pool:
+            for _ in range(2):
+                response = await pool.request("GET", "/", timeout=0.2)
+                assert response.status == 204
+
+                # The server closes the connection after responding, without
+                # a connection: close header
+                (connection,) = pool._idle
+                while not connection._reader.at_eof():
+                    await asyncio.sleep(0)
+
+            assert pool._size == 1
+
+    loop.run_until_complete(_async())
+
+
+@pytest.mark.parametrize("handler", (handle_rst_after_response,), indirect=True)
+def test_pool_discards_reset_idle_connections(loop, port):
+    async def _async():
+        async with pywreck.Pool("localhost", port=port, ssl=False, max_size=1) as pool:
+            for _ in range(2):
+                response = await pool.request("GET", "/", timeout=0.2)
+                assert response.status == 204
+
+                # The server resets the connection after responding
+                (connection,) = pool._idle
+                while connection._reader.exception() is None:
+                    await asyncio.sleep(0)
+
+            assert pool._size == 1
+
+    loop.run_until_complete(_async())
+
+
+def test_dns_cache(loop, echo_port):
+    key = ("localhost", echo_port)
+    # The first cached address refuses connections; the next one is tried
+    pywreck._DNS_CACHE[key] = (
+        math.inf,
+        [(socket.AF_INET, "127.0.0.2"), (socket.AF_INET, "127.0.0.1")],
+    )
+    try:
+        response = loop.run_until_complete(
+            pywreck.get("localhost", "/", port=echo_port, ssl=False, timeout=0.2)
+        )
+        assert response.status == 200
+        assert response.data.split(b"\r\n")[1] == b"host:localhost"
+    finally:
+        del pywreck._DNS_CACHE[key]
+
+
+def test_dns_cache_ip_literal(loop, echo_port):
+    response = loop.run_until_complete(
+        pywreck.get("127.0.0.1", "/", port=echo_port, ssl=False, timeout=0.2)
+    )
+    assert response.status == 200
+    assert ("127.0.0.1", echo_port) not in pywreck._DNS_CACHE
+
+
+def test_dns_cache_prunes_expired_entries(loop, echo_port):
+    expired = ("expired.invalid", echo_port)
+    pywreck._DNS_CACHE[expired] = (0.0, [(socket.AF_INET, "127.0.0.1")])
+    try:
+        loop.run_until_complete(pywreck._resolve("localhost", echo_port))
+        assert expired not in pywreck._DNS_CACHE
+    finally:
+        pywreck._DNS_CACHE.pop(expired, None)
+        pywreck._DNS_CACHE.pop(("localhost", echo_port), None)
+
+
+def test_dns_cache_ipv6_scope_id(loop, monkeypatch):
+    async def getaddrinfo(host, port, **kwargs):
+        sockaddr = ("fe80::1", port, 0, 2)
+        return [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", sockaddr)]
+
+    monkeypatch.setattr(loop, "getaddrinfo", getaddrinfo)
+    try:
+        addresses = loop.run_until_complete(pywreck._resolve("link-local", 80))
+        assert addresses == [(socket.AF_INET6, "fe80::1%2")]
+    finally:
+        pywreck._DNS_CACHE.pop(("link-local", 80), None)
+
+
+@pytest.mark.parametrize("handler", (handle_plaintext,), indirect=True)
+def test_dns_cache_ssl_error(loop, port):
+    key = ("localhost", port)
+    addresses = [(socket.AF_INET, "127.0.0.1"), (socket.AF_INET, "127.0.0.1")]
+    pywreck._DNS_CACHE[key] = (math.inf, addresses)
+    try:
+        # The server does not speak TLS; the handshake error is raised
+        # without trying the remaining addresses or evicting the entry
+        with pytest.raises(ssl.SSLError):
+            loop.run_until_complete(pywreck.Connection.create("localhost", port=port))
+        assert pywreck._DNS_CACHE[key] == (math.inf, addresses)
+    finally:
+        del pywreck._DNS_CACHE[key]
+
+
+def test_read_limit(loop, echo_port):
+    async def _async():
+        connection = await pywreck.Connection.create(
+            "localhost",
+            port=echo_port,
+            ssl=False,
+            read_limit=2**20,
+        )
+
+        async with connection:
+            assert connection._reader._limit == 2**20
+            response = await connection.request("GET", "/")
+            assert response.status == 200
+
+    loop.run_until_complete(_async())
+
+
+def test_payload(loop, echo_port):
     response = loop.run_until_complete(
         pywreck.post(
             "localhost",
             "/foo",
             headers={"user-agent": "pywreck test, yo!"},
             payload=b"payload, yo!",
-            port=port,
+            port=echo_port,
             ssl=False,
             timeout=0.2,
         )
@@ -159,19 +471,37 @@ def test_payload(loop, port):
     assert response.data == expected_data
 
 
+def test_custom_headers_and_payload(loop, echo_port):
+    response = loop.run_until_complete(
+        pywreck.post(
+            "localhost",
+            "/foo",
+            headers={"x-foo": "bar"},
+            payload=b"payload, yo!",
+            port=echo_port,
+            ssl=False,
+            timeout=0.2,
+        )
+    )
+    assert response.status == 200
+    data = response.data.split(b"\r\n")
+    assert data[:2] == [b"POST /foo HTTP/1.1", b"host:localhost"]
+    assert data[2].startswith(b"user-agent:pywreck/")
+    assert data[3:] == [b"content-length:12", b"x-foo:bar", b"", b"payload, yo!"]
+
+
 @pytest.mark.parametrize(
     "method",
     ("", "get", "post", "put", "delete"),
 )
-@pytest.mark.parametrize("handler", (handle_echo,), indirect=True)
-def test_default_headers_and_payload(loop, port, method):
+def test_default_headers_and_payload(loop, echo_port, method):
     if not method:
         method = "GET"
         f = functools.partial(pywreck.request, method, timeout=None)
     else:
         f = getattr(pywreck, method)
 
-    response = loop.run_until_complete(f("localhost", "/", port=port, ssl=False))
+    response = loop.run_until_complete(f("localhost", "/", port=echo_port, ssl=False))
     assert response.status == 200
     data = response.data.split(b"\r\n")
     assert len(data) == 5
@@ -193,6 +523,16 @@ def test_multi_line_response_header(loop, port):
     assert response.data == b""
 
 
+@pytest.mark.parametrize("handler", (handle_no_headers,), indirect=True)
+def test_no_response_headers(loop, port):
+    response = loop.run_until_complete(
+        pywreck.get("localhost", "/", port=port, ssl=False, timeout=0.2)
+    )
+    assert response.status == 204
+    assert response.headers == {}
+    assert response.data == b""
+
+
 @pytest.mark.parametrize("handler", (handle_cookies,), indirect=True)
 def test_cookies(loop, port):
     response = loop.run_until_complete(
@@ -236,11 +576,31 @@ def test_transport_rst(loop, port):
         )
 
 
+@pytest.mark.parametrize("handler", (handle_rst_after_response,), indirect=True)
+def test_request_on_a_reset_connection(loop, port):
+    async def _async():
+        connection = await pywreck.Connection.create("localhost", port=port, ssl=False)
+        try:
+            response = await connection.request("GET", "/", timeout=0.2)
+            assert response.status == 204
+
+            # Wait for the transport to process the reset
+            while connection._reader.exception() is None:
+                await asyncio.sleep(0)
+
+            with pytest.raises(ConnectionResetError):
+                await connection.request("GET", "/", timeout=0.2)
+        finally:
+            connection._transport.abort()
+
+    loop.run_until_complete(_async())
+
+
 @pytest.mark.parametrize("handler", (handle_fin,), indirect=True)
 def test_transport_fin(loop, port):
     """A server will sometimes close a connection gracefully with a FIN before
     a response is started"""
-    with pytest.raises(IndexError):
+    with pytest.raises(asyncio.IncompleteReadError):
         loop.run_until_complete(
             pywreck.get("localhost", "/", port=port, ssl=False, timeout=0.2)
         )